@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+dist_metadata.py
+Distribution metadata generators for the Helwan ISO Signer.
+- ZSYNC: .zsync control file (rsum + MD4 block checksums) for delta downloads.
+- TORRENT: hybrid BitTorrent v1/v2 .torrent (SHA1 pieces + SHA256 merkle piece layers).
+Every generator is a streaming consumer with update() fed from the same read loop that
+calculates the release hashes. The zsync rolling checksum is too slow for that loop, so
+ZsyncBuilder pipes each chunk to a separate process (zsyncmake when installed, otherwise
+this module's built-in generator) instead of letting it read the ISO again.
+
+Usage (worker mode, used by ZsyncBuilder; the file contents arrive on stdin):
+    python3 dist_metadata.py zsync <file> <output .zsync> < <file>
+"""
+import hashlib, math, os, shutil, subprocess, sys
+from email.utils import format_datetime
+from itertools import accumulate
+from datetime import datetime, timezone
+from pathlib import Path
+
+ZSYNC_VERSION = "0.6.2"
+TORRENT_BLOCK_SIZE = 16 * 1024  # BEP 52 leaf block size
+TORRENT_MIN_PIECE = 256 * 1024
+TORRENT_MAX_PIECE = 16 * 1024 * 1024
+TORRENT_TARGET_PIECES = 2000
+CREATED_BY = "Helwan ISO Signer"
+
+
+# Helper function to check whether OpenSSL still exposes MD4 (needed by zsync).
+def md4_available():
+    try:
+        hashlib.new("md4")
+        return True
+    except ValueError:
+        return False
+
+
+# Minimal bencode encoder (dict keys are emitted in raw byte order as the spec requires).
+def bencode(value):
+    if isinstance(value, bool):
+        raise TypeError("bencode does not support booleans")
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray)):
+        return b"%d:%s" % (len(value), bytes(value))
+    if isinstance(value, (list, tuple)):
+        return b"l" + b"".join(bencode(v) for v in value) + b"e"
+    if isinstance(value, dict):
+        items = []
+        for k, v in value.items():
+            items.append((k.encode("utf-8") if isinstance(k, str) else bytes(k), v))
+        items.sort(key=lambda kv: kv[0])
+        return b"d" + b"".join(bencode(k) + bencode(v) for k, v in items) + b"e"
+    raise TypeError(f"Cannot bencode value of type {type(value).__name__}")
+
+
+# Base class that slices an arbitrary chunk stream into fixed-size blocks.
+class _BlockConsumer:
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._buf = bytearray()
+
+    def update(self, chunk):
+        bs = self.block_size
+        if self._buf:
+            need = bs - len(self._buf)
+            self._buf += chunk[:need]
+            chunk = chunk[need:]
+            if len(self._buf) < bs:
+                return
+            self._block(bytes(self._buf))
+            self._buf.clear()
+        view = memoryview(chunk)
+        full = len(view) - (len(view) % bs)
+        for off in range(0, full, bs):
+            self._block(view[off:off + bs])
+        if full < len(view):
+            self._buf += view[full:]
+
+    def _tail(self):
+        tail = bytes(self._buf)
+        self._buf.clear()
+        return tail
+
+    def _block(self, block):
+        raise NotImplementedError
+
+
+class ZsyncGenerator(_BlockConsumer):
+    """Builds a zsync 0.6.2 control file compatible with zsyncmake output."""
+
+    def __init__(self, file_path, url=None):
+        file_path = Path(file_path)
+        self.length = os.path.getsize(file_path)
+        self.filename = file_path.name
+        self.url = url or file_path.name
+        self.mtime = os.path.getmtime(file_path)
+        super().__init__(2048 if self.length < 100000000 else 4096)
+        self.seq_matches, self.rsum_len, self.checksum_len = self._hash_lengths()
+        self._sums = bytearray()
+        self._sha1 = hashlib.sha1()
+
+    # Same heuristics as zsyncmake for the number of bytes stored per block.
+    def _hash_lengths(self):
+        length, bs = max(self.length, 1), self.block_size
+        seq_matches = 2 if length > bs else 1
+        rsum_len = math.ceil(((math.log(length) + math.log(bs)) / math.log(2) - 8.6) / seq_matches / 8)
+        rsum_len = min(4, max(2, rsum_len))
+        checksum_len = math.ceil((20 + (math.log(length) + math.log(1 + length // bs)) / math.log(2)) / seq_matches / 8)
+        checksum_len2 = int((7.9 + (20 + math.log(1 + length // bs) / math.log(2))) / 8)
+        checksum_len = min(16, max(checksum_len, checksum_len2))
+        return seq_matches, rsum_len, checksum_len
+
+    def update(self, chunk):
+        self._sha1.update(chunk)
+        super().update(chunk)
+
+    def _block(self, block):
+        a = sum(block) & 0xFFFF
+        b = sum(accumulate(block)) & 0xFFFF
+        rsum = a.to_bytes(2, "big") + b.to_bytes(2, "big")
+        self._sums += rsum[4 - self.rsum_len:]
+        self._sums += hashlib.new("md4", block).digest()[:self.checksum_len]
+
+    def finalize(self):
+        tail = self._tail()
+        if tail:
+            self._block(tail + bytes(self.block_size - len(tail)))
+        # RFC 2822 date built without strftime, which would follow LC_TIME (non-ASCII names)
+        mtime = format_datetime(datetime.fromtimestamp(int(self.mtime), timezone.utc))
+        header = "".join([
+            f"zsync: {ZSYNC_VERSION}\n",
+            f"Filename: {self.filename}\n",
+            f"MTime: {mtime}\n",
+            f"Blocksize: {self.block_size}\n",
+            f"Length: {self.length}\n",
+            f"Hash-Lengths: {self.seq_matches},{self.rsum_len},{self.checksum_len}\n",
+            f"URL: {self.url}\n",
+            f"SHA-1: {self._sha1.hexdigest()}\n",
+            "\n",
+        ])
+        return header.encode("ascii") + bytes(self._sums)
+
+    def write(self, outpath):
+        Path(outpath).write_bytes(self.finalize())
+        return read_zsync_header(outpath)
+
+
+# Helper function to summarize a .zsync control file for the release report.
+def read_zsync_header(path):
+    header = {}
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.decode("ascii", "replace").rstrip("\n")
+            if not line:
+                break
+            key, _, value = line.partition(": ")
+            header[key] = value
+    blocksize, length = int(header["Blocksize"]), int(header["Length"])
+    return {
+        "Blocksize": blocksize,
+        "Blocks": (length + blocksize - 1) // blocksize,
+        "Hash-Lengths": header.get("Hash-Lengths", ""),
+    }
+
+
+def zsyncmake_path():
+    return shutil.which("zsyncmake")
+
+
+# zsync needs either the zsyncmake tool or MD4 for the built-in generator.
+def zsync_available():
+    return bool(zsyncmake_path()) or md4_available()
+
+
+class ZsyncBuilder:
+    """Streaming consumer that pipes the hashing pass into a zsync worker process.
+
+    The ISO is still read only once; the slow rolling checksum just runs on another core.
+    """
+
+    def __init__(self, file_path, outpath):
+        self.file_path = Path(file_path)
+        self.outpath = Path(outpath)
+        self.tool = "zsyncmake" if zsyncmake_path() else "built-in"
+        self._proc = None
+        self._broken = False
+
+    def start(self):
+        if self.tool == "zsyncmake":
+            # No file argument: zsyncmake reads the data from stdin
+            cmd = [zsyncmake_path(), "-f", self.file_path.name, "-u", self.file_path.name, "-o", str(self.outpath)]
+        else:
+            cmd = [sys.executable, os.path.abspath(__file__), "zsync", str(self.file_path), str(self.outpath)]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        return self
+
+    def update(self, chunk):
+        if self._broken:
+            return
+        try:
+            self._proc.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            self._broken = True # the worker died; wait() reports its exit status
+
+    # Close the worker's stdin (communicate does) and wait for it; returns the report details,
+    # or None if cancel_event was set.
+    def wait(self, cancel_event=None):
+        while True:
+            try:
+                _, err = self._proc.communicate(timeout=0.2)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel_event is not None and cancel_event.is_set():
+                    self.terminate()
+                    return None
+        if self._proc.returncode != 0:
+            err = err.decode("utf-8", "replace").strip()
+            raise RuntimeError(f"{self.tool} zsync generation failed (exit {self._proc.returncode}): {err}")
+        details = read_zsync_header(self.outpath)
+        details["Generator"] = self.tool
+        return details
+
+    # Stop a still-running worker and drop its partial output (no-op once it has exited).
+    def terminate(self):
+        if self._proc is None or self._proc.poll() is not None:
+            return
+        self._proc.terminate()
+        try:
+            self._proc.communicate(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.communicate()
+        try:
+            self.outpath.unlink()
+        except OSError:
+            pass
+
+
+# Helper function to fold a list of SHA256 nodes into a merkle root.
+def _merkle_root(nodes, leaf_count, pad):
+    layer = list(nodes) + [pad] * (leaf_count - len(nodes))
+    while len(layer) > 1:
+        layer = [hashlib.sha256(layer[i] + layer[i + 1]).digest() for i in range(0, len(layer), 2)]
+    return layer[0]
+
+
+def _next_pow2(n):
+    return 1 << max(0, (n - 1).bit_length())
+
+
+def choose_piece_length(length):
+    piece = TORRENT_MIN_PIECE
+    while piece < TORRENT_MAX_PIECE and length / piece > TORRENT_TARGET_PIECES:
+        piece *= 2
+    return piece
+
+
+class TorrentGenerator(_BlockConsumer):
+    """Builds a hybrid (v1 + v2) single-file .torrent from one streaming pass.
+
+    web_seeds are mirror URLs (BEP 19); a URL ending in "/" is a directory the client
+    appends the file name to, so one mirror list works for every ISO.
+    """
+
+    def __init__(self, file_path, piece_length=None, trackers=None, web_seeds=None):
+        file_path = Path(file_path)
+        self.name = file_path.name
+        self.length = os.path.getsize(file_path)
+        self.piece_length = piece_length or choose_piece_length(self.length)
+        if self.piece_length % TORRENT_BLOCK_SIZE or self.piece_length & (self.piece_length - 1):
+            raise ValueError("Torrent piece length must be a power of two and a multiple of 16 KiB.")
+        self.trackers = list(trackers or [])
+        self.web_seeds = list(web_seeds or [])
+        super().__init__(TORRENT_BLOCK_SIZE)
+        self._blocks_per_piece = self.piece_length // TORRENT_BLOCK_SIZE
+        self._piece_sha1 = hashlib.sha1()
+        self._piece_leaves = []
+        self._v1_pieces = bytearray()
+        self._v2_layer = []
+        self._first_leaves = None
+
+    def _block(self, block):
+        self._piece_sha1.update(block)
+        self._piece_leaves.append(hashlib.sha256(block).digest())
+        if len(self._piece_leaves) == self._blocks_per_piece:
+            self._close_piece()
+
+    def _close_piece(self):
+        self._v1_pieces += self._piece_sha1.digest()
+        self._v2_layer.append(_merkle_root(self._piece_leaves, self._blocks_per_piece, bytes(32)))
+        if self._first_leaves is None:
+            self._first_leaves = self._piece_leaves
+        self._piece_sha1 = hashlib.sha1()
+        self._piece_leaves = []
+
+    def _pieces_root(self):
+        # A file that fits in one piece has no piece layer; its tree is padded to the
+        # next power of two of its own leaves rather than to a full piece.
+        zero = bytes(32)
+        if len(self._v2_layer) == 1:
+            leaves = self._first_leaves
+            return _merkle_root(leaves, _next_pow2(len(leaves)), zero), b""
+        pad = _merkle_root([], self._blocks_per_piece, zero)
+        roots = self._v2_layer
+        return _merkle_root(roots, _next_pow2(len(roots)), pad), b"".join(roots)
+
+    def finalize(self):
+        tail = self._tail()
+        if tail:
+            self._block(tail)
+        if self._piece_leaves:
+            self._close_piece()
+
+        file_entry = {"length": self.length}
+        piece_layers = {}
+        if self.length:
+            pieces_root, layer = self._pieces_root()
+            file_entry["pieces root"] = pieces_root
+            if layer:
+                piece_layers[pieces_root] = layer
+
+        meta = {
+            "created by": CREATED_BY,
+            "creation date": int(datetime.now(timezone.utc).timestamp()),
+            "info": {
+                "name": self.name,
+                "piece length": self.piece_length,
+                "length": self.length,
+                "pieces": bytes(self._v1_pieces),
+                "meta version": 2,
+                "file tree": {self.name: {"": file_entry}},
+            },
+            "piece layers": piece_layers,
+        }
+        if self.trackers:
+            meta["announce"] = self.trackers[0]
+            meta["announce-list"] = [[t] for t in self.trackers]
+        if self.web_seeds:
+            meta["url-list"] = self.web_seeds
+        return meta
+
+    def write(self, outpath):
+        meta = self.finalize()
+        Path(outpath).write_bytes(bencode(meta))
+        info = bencode(meta["info"])
+        details = {
+            "Piece length": self.piece_length,
+            "Pieces": len(self._v1_pieces) // 20,
+            "Info hash (v1)": hashlib.sha1(info).hexdigest(),
+            "Info hash (v2)": hashlib.sha256(info).hexdigest(),
+        }
+        if self.trackers:
+            details["Trackers"] = ", ".join(self.trackers)
+        if self.web_seeds:
+            details["Web seeds"] = ", ".join(self.web_seeds)
+        return details
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "zsync":
+        print("Usage: python3 dist_metadata.py zsync <file> <output .zsync> < <file>", file=sys.stderr)
+        sys.exit(2)
+    gen = ZsyncGenerator(sys.argv[2])
+    for chunk in iter(lambda: sys.stdin.buffer.read(1024 * 1024), b""):
+        gen.update(chunk)
+    gen.write(sys.argv[3])
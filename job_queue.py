@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+job_queue.py
+Persistent signing job queue with device-aware scheduling for the Helwan ISO Signer GUI.
+- Jobs run concurrently up to a CPU limit.
+- Jobs whose ISO or output directory sits on the same physical disk are serialized
+  (parallel streams on one disk only add seek thrash).
+- The queue is saved as JSON so it survives restarting the app.
+"""
+import json, os, re, uuid
+from pathlib import Path
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+def default_queue_file():
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return Path(config_home) / "helwan-iso-signer" / "queue.json"
+
+
+# Helper function to map a sysfs block device to the whole disk(s) backing it.
+def _physical_disks(sys_block):
+    slaves = sys_block / "slaves"
+    if slaves.is_dir() and any(slaves.iterdir()):
+        disks = set()
+        for slave in slaves.iterdir():
+            disks |= _physical_disks(slave.resolve())
+        return disks
+    if (sys_block / "partition").exists():
+        sys_block = sys_block.parent
+    return {sys_block.name}
+
+
+def _disks_for_dev(dev):
+    sys_block = Path(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    return _physical_disks(sys_block.resolve(strict=True))
+
+
+def _unescape_mountinfo(field):
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+# Helper function to find the source device of the mount containing a path (longest mount point wins,
+# later entries win ties so over-mounts are honoured).
+def mount_source(path, mountinfo="/proc/self/mountinfo"):
+    path = str(path)
+    best, source = None, None
+    try:
+        with open(mountinfo, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        fields = line.split(" ")
+        if "-" not in fields:
+            continue
+        sep = fields.index("-")
+        mount_point = _unescape_mountinfo(fields[4])
+        inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+        if inside and (best is None or len(mount_point) >= len(best)):
+            best, source = mount_point, _unescape_mountinfo(fields[sep + 2])
+    return source
+
+
+# Function to find the physical device(s) a path lives on (partitions, LVM and dm-crypt resolve to their disks).
+def device_ids(path):
+    path = Path(path).expanduser().absolute()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    st_dev = os.stat(path).st_dev
+    try:
+        return _disks_for_dev(st_dev)
+    except OSError:
+        pass
+    # btrfs subvolumes (@, @home, ...) get anonymous 0:N devices without a sysfs entry;
+    # the mount's source block device still names the real disk
+    source = mount_source(path.resolve())
+    if source and source.startswith("/dev/"):
+        try:
+            return _disks_for_dev(os.stat(source).st_rdev)
+        except OSError:
+            pass
+    # tmpfs, network mounts, non-Linux: fall back to the filesystem device
+    return {f"dev:{st_dev}"}
+
+
+# Function to collect every physical device a signing run touches (ISO source + output root).
+def job_devices(iso_path, output_dir):
+    try:
+        return device_ids(iso_path) | device_ids(output_dir)
+    except OSError:
+        return set()
+
+
+class SigningJob:
+    def __init__(self, iso_path, output_dir, hash_algs, dist_formats=None, web_seeds=None, trackers=None,
+                 job_id=None, status=QUEUED, progress=0, error="", dest_dir="", throughput=0.0):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        # Saved paths must not depend on the working directory the app is started from
+        self.iso_path = os.path.abspath(os.path.expanduser(iso_path))
+        self.output_dir = os.path.abspath(os.path.expanduser(output_dir))
+        self.hash_algs = list(hash_algs)
+        self.dist_formats = list(dist_formats or [])
+        self.web_seeds = list(web_seeds or [])
+        self.trackers = list(trackers or [])
+        self.status = status
+        self.progress = progress
+        self.error = error
+        self.dest_dir = dest_dir
+        self.throughput = throughput # bytes per second during the hashing pass
+        self._devices = None
+
+    @property
+    def devices(self):
+        if self._devices is None:
+            self._devices = job_devices(self.iso_path, self.output_dir)
+        return self._devices
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "iso_path": self.iso_path,
+            "output_dir": self.output_dir,
+            "hash_algs": self.hash_algs,
+            "dist_formats": self.dist_formats,
+            "web_seeds": self.web_seeds,
+            "trackers": self.trackers,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "dest_dir": self.dest_dir,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class JobQueue:
+    def __init__(self, queue_file=None, max_concurrent=None):
+        self.queue_file = Path(queue_file) if queue_file else default_queue_file()
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.jobs = []
+
+    def load(self):
+        if not self.queue_file.exists():
+            return self
+        data = json.loads(self.queue_file.read_text(encoding="utf-8"))
+        self.jobs = [SigningJob.from_dict(item) for item in data.get("jobs", [])]
+        # Jobs that were running when the app closed start over
+        for job in self.jobs:
+            if job.status == RUNNING:
+                job.status, job.progress = QUEUED, 0
+        return self
+
+    def save(self):
+        self.queue_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.queue_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"jobs": [job.to_dict() for job in self.jobs]}, indent=2), encoding="utf-8")
+        os.replace(tmp, self.queue_file)
+
+    def add(self, job):
+        self.jobs.append(job)
+        self.save()
+        return job
+
+    def get(self, job_id):
+        for job in self.jobs:
+            if job.job_id == job_id:
+                return job
+        return None
+
+    def remove(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status == RUNNING:
+            return False
+        self.jobs.remove(job)
+        self.save()
+        return True
+
+    def set_status(self, job, status, error="", dest_dir=""):
+        job.status = status
+        job.error = error
+        if dest_dir:
+            job.dest_dir = dest_dir
+        if status == DONE:
+            job.progress = 100
+        self.save()
+
+    def retry(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status not in (FAILED, CANCELLED):
+            return False
+        job.progress, job.throughput = 0, 0.0
+        self.set_status(job, QUEUED)
+        return True
+
+    # Pick the queued jobs that may start now: FIFO order, within the CPU limit,
+    # never sharing a physical device with a running job (or with each other).
+    # busy_devices/busy_slots account for signing runs started outside the queue.
+    def runnable_jobs(self, busy_devices=None, busy_slots=0):
+        running = [job for job in self.jobs if job.status == RUNNING]
+        slots = self.max_concurrent - len(running) - busy_slots
+        busy = set(busy_devices or ())
+        for job in running:
+            busy |= job.devices
+        selected = []
+        for job in self.jobs:
+            if slots <= 0:
+                break
+            if job.status != QUEUED or job.devices & busy:
+                continue
+            selected.append(job)
+            busy |= job.devices
+            slots -= 1
+        return selected
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+release_catalog.py
+SQLite catalog of every release produced by the Helwan ISO Signer.
+- One catalog per output root: <output root>/release_catalog.sqlite3
+- Indexed lookups by digest (any algorithm), GPG fingerprint / long key ID and ISO name.
+- Import tool to index existing release folders (<iso>.report.json or legacy <iso>.report.txt).
+
+Usage:
+    python3 release_catalog.py import <output root>
+    python3 release_catalog.py lookup <output root> --hash <hex>
+    python3 release_catalog.py lookup <output root> --key <fingerprint or long key id>
+"""
+import argparse, json, sqlite3, sys
+from pathlib import Path
+
+CATALOG_NAME = "release_catalog.sqlite3"
+SCHEMA_VERSION = 1
+
+# Artifact kinds used in JSON reports, keyed by the labels of the legacy text report.
+TEXT_REPORT_ARTIFACTS = {
+    "Signature (binary)": "signature",
+    "Signature (armored)": "signature_armored",
+    "Public Key": "public_key",
+    "ZSYNC": "zsync",
+    "TORRENT": "torrent",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    id           INTEGER PRIMARY KEY,
+    iso_name     TEXT NOT NULL,
+    size         INTEGER,
+    volume_id    TEXT,
+    source_path  TEXT,
+    source_mtime REAL,
+    generated    TEXT,
+    release_dir  TEXT NOT NULL UNIQUE,
+    fingerprint  TEXT,
+    long_key_id  TEXT,
+    report_json  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS digests (
+    release_id INTEGER NOT NULL REFERENCES releases(id) ON DELETE CASCADE,
+    algo       TEXT NOT NULL,
+    hex        TEXT NOT NULL,
+    PRIMARY KEY (release_id, algo)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    release_id INTEGER NOT NULL REFERENCES releases(id) ON DELETE CASCADE,
+    kind       TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    PRIMARY KEY (release_id, kind)
+);
+CREATE TABLE IF NOT EXISTS timings (
+    release_id INTEGER NOT NULL REFERENCES releases(id) ON DELETE CASCADE,
+    stage      TEXT NOT NULL,
+    seconds    REAL NOT NULL,
+    PRIMARY KEY (release_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_digests_hex ON digests(hex);
+CREATE INDEX IF NOT EXISTS idx_releases_fingerprint ON releases(fingerprint);
+CREATE INDEX IF NOT EXISTS idx_releases_long_key_id ON releases(long_key_id);
+CREATE INDEX IF NOT EXISTS idx_releases_iso_name ON releases(iso_name);
+"""
+
+
+# Helper function to turn a hex prefix into an index-friendly [low, high) range.
+def _prefix_range(value):
+    value = value.strip().lower()
+    return value, value + "\uffff"
+
+
+class ReleaseCatalog:
+    """Thin wrapper around the catalog database; safe to open from several signing threads.
+
+    By default the catalog is opened read-only (SQLite mode=ro) and must already exist;
+    pass create=True (signing runs, import) to open it read-write and create it if needed.
+    """
+
+    def __init__(self, output_root, create=False):
+        self.path = Path(output_root) / CATALOG_NAME
+        if not create and not self.path.is_file():
+            raise FileNotFoundError(f"No release catalog found at {self.path}")
+        if create:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(self.path), timeout=30)
+        else:
+            # Lookups only read; mode=ro keeps them from writing or creating anything
+            self.conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        if create:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Insert (or replace, keyed by release dir) one release described by a JSON report dict.
+    def record_release(self, report):
+        gpg = report.get("gpg", {})
+        identity = report.get("identity", {})
+        fingerprint = (gpg.get("fingerprint") or "").upper() or None
+        long_key_id = (gpg.get("long_key_id") or (fingerprint[-16:] if fingerprint else "")).upper() or None
+        with self.conn:
+            self.conn.execute("DELETE FROM releases WHERE release_dir = ?", (report["release_dir"],))
+            cur = self.conn.execute(
+                "INSERT INTO releases (iso_name, size, volume_id, source_path, source_mtime, generated,"
+                " release_dir, fingerprint, long_key_id, report_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    report["file"], report.get("size"), identity.get("volume_id"),
+                    identity.get("source_path"), identity.get("source_mtime"), report.get("generated"),
+                    report["release_dir"], fingerprint, long_key_id, json.dumps(report, sort_keys=True),
+                ),
+            )
+            release_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO digests (release_id, algo, hex) VALUES (?, ?, ?)",
+                [(release_id, algo.upper(), hex_digest.lower()) for algo, hex_digest in report.get("hashes", {}).items()],
+            )
+            self.conn.executemany(
+                "INSERT INTO artifacts (release_id, kind, path) VALUES (?, ?, ?)",
+                [(release_id, kind, path) for kind, path in report.get("artifacts", {}).items()],
+            )
+            self.conn.executemany(
+                "INSERT INTO timings (release_id, stage, seconds) VALUES (?, ?, ?)",
+                [(release_id, stage, seconds) for stage, seconds in report.get("timings", {}).items()],
+            )
+        return release_id
+
+    def _releases(self, where, params):
+        rows = self.conn.execute(
+            f"SELECT DISTINCT r.* FROM releases r {where} ORDER BY r.generated DESC", params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Find releases whose digest (any algorithm) starts with the given hex.
+    def find_by_hash(self, hex_digest):
+        low, high = _prefix_range(hex_digest)
+        return self._releases("JOIN digests d ON d.release_id = r.id WHERE d.hex >= ? AND d.hex < ?", (low, high))
+
+    # Find releases signed by a full fingerprint or a long key ID.
+    def find_by_key(self, key):
+        key = key.strip().upper().replace(" ", "")
+        if len(key) > 16:
+            return self._releases("WHERE r.fingerprint = ?", (key,))
+        return self._releases("WHERE r.long_key_id = ?", (key,))
+
+    def find_by_name(self, iso_name):
+        return self._releases("WHERE r.iso_name = ?", (iso_name,))
+
+    def digests(self, release_id):
+        rows = self.conn.execute("SELECT algo, hex FROM digests WHERE release_id = ?", (release_id,)).fetchall()
+        return {row["algo"]: row["hex"] for row in rows}
+
+    def artifacts(self, release_id):
+        rows = self.conn.execute("SELECT kind, path FROM artifacts WHERE release_id = ?", (release_id,)).fetchall()
+        return {row["kind"]: row["path"] for row in rows}
+
+    def timings(self, release_id):
+        rows = self.conn.execute("SELECT stage, seconds FROM timings WHERE release_id = ?", (release_id,)).fetchall()
+        return {row["stage"]: row["seconds"] for row in rows}
+
+
+# Function to rebuild a JSON-style report dict from a legacy <iso>.report.txt.
+def parse_text_report(report_path):
+    report_path = Path(report_path)
+    release_dir = report_path.parent.resolve()
+    report = {"release_dir": str(release_dir), "hashes": {}, "gpg": {}, "artifacts": {}, "identity": {}}
+    section = None
+    for line in report_path.read_text(encoding="utf-8").splitlines():
+        if line.startswith("---"):
+            section = line.strip("- ").lower()
+            continue
+        if ": " not in line or line.startswith(" "):
+            continue
+        key, value = [part.strip() for part in line.split(": ", 1)]
+        if key == "File":
+            report["file"] = value
+        elif key == "Size":
+            report["size"] = int(value.split()[0])
+        elif key == "Generated":
+            report["generated"] = value
+        elif key == "GPG Fingerprint":
+            report["gpg"]["fingerprint"] = value
+        elif key == "GPG Key ID (long)":
+            report["gpg"]["long_key_id"] = value
+        elif section == "hashes":
+            report["hashes"][key.upper()] = value
+        elif key in TEXT_REPORT_ARTIFACTS and not value.startswith("skipped"):
+            report["artifacts"][TEXT_REPORT_ARTIFACTS[key]] = str(release_dir / value)
+    if "file" not in report:
+        raise ValueError(f"Not a signer report: {report_path}")
+    iso_copy = release_dir / report["file"]
+    if iso_copy.exists():
+        report["artifacts"]["iso"] = str(iso_copy)
+    report["artifacts"]["report"] = str(report_path.resolve())
+    if (release_dir / "sign_iso.log").exists():
+        report["artifacts"]["log"] = str(release_dir / "sign_iso.log")
+    return report
+
+
+# Function to index every release folder under an output root (JSON reports win over text ones).
+def import_release_folders(output_root, log_callback=print):
+    output_root = Path(output_root)
+    imported = 0
+    if not output_root.is_dir():
+        raise FileNotFoundError(f"Output root not found: {output_root}")
+    with ReleaseCatalog(output_root, create=True) as catalog:
+        for release_dir in sorted(p for p in output_root.iterdir() if p.is_dir()):
+            json_reports = sorted(release_dir.glob("*.report.json"))
+            text_reports = sorted(release_dir.glob("*.report.txt"))
+            try:
+                if json_reports:
+                    report = json.loads(json_reports[0].read_text(encoding="utf-8"))
+                    report["release_dir"] = str(release_dir.resolve())
+                elif text_reports:
+                    report = parse_text_report(text_reports[0])
+                else:
+                    continue
+                catalog.record_release(report)
+                imported += 1
+                log_callback(f"Indexed {release_dir.name}")
+            except (ValueError, KeyError, OSError) as e:
+                log_callback(f"Warning: Skipped {release_dir.name}: {e}")
+    log_callback(f"Imported {imported} release(s) into {output_root / CATALOG_NAME}")
+    return imported
+
+
+def _print_releases(catalog, releases):
+    if not releases:
+        print("No matching releases.")
+    for release in releases:
+        print(f"{release['iso_name']}  ({release['size']} bytes, {release['generated']})")
+        print(f"  Release dir: {release['release_dir']}")
+        print(f"  Fingerprint: {release['fingerprint']}")
+        for algo, hex_digest in catalog.digests(release["id"]).items():
+            print(f"  {algo}: {hex_digest}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Helwan ISO Signer release catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="index existing release folders")
+    p_import.add_argument("output_root")
+    p_lookup = sub.add_parser("lookup", help="find releases by hash, key or ISO name")
+    p_lookup.add_argument("output_root")
+    group = p_lookup.add_mutually_exclusive_group(required=True)
+    group.add_argument("--hash", help="full digest or hex prefix (any algorithm)")
+    group.add_argument("--key", help="GPG fingerprint or long key ID")
+    group.add_argument("--name", help="ISO file name")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "import":
+            import_release_folders(args.output_root)
+            return 0
+        catalog = ReleaseCatalog(args.output_root)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    with catalog:
+        if args.hash:
+            releases = catalog.find_by_hash(args.hash)
+        elif args.key:
+            releases = catalog.find_by_key(args.key)
+        else:
+            releases = catalog.find_by_name(args.name)
+        _print_releases(catalog, releases)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,21 +2,63 @@
 """
 signer_gui.py
 PyQt5 GUI application to wrap the ISO signing logic.
-Features: English UI, Output dir selector, SHA512, SHA3-512, BLAKE2b, Global Progress Bar, and Verify tab.
+Features: English UI, Output dir selector, SHA512, SHA3-512, BLAKE2b, zsync/torrent metadata, Global Progress Bar,
+Job Queue tab (device-aware concurrent signing) and Verify tab.
 """
 import sys
 import os
 import subprocess
+import threading
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QLineEdit, QPushButton, QTextEdit, QLabel, QFileDialog, QMessageBox,
-    QProgressBar, QTabWidget, QCheckBox, QGroupBox, QGridLayout
+    QProgressBar, QTabWidget, QCheckBox, QGroupBox, QGridLayout,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QSpinBox
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QDir
 from PyQt5.QtGui import QIcon
 
 # Import the core signing logic functions
-from signer_logic import execute_signing_process, verify_iso_signature
+from signer_logic import execute_signing_process, verify_iso_signature, SigningCancelled
+from dist_metadata import zsync_available
+from job_queue import JobQueue, SigningJob, job_devices, QUEUED, RUNNING, DONE, FAILED, CANCELLED, FINISHED_STATES
+
+HASH_CHOICES = [
+    ('SHA256', "SHA256 (Recommended)"),
+    ('SHA512', "SHA512"),
+    ('SHA3_512', "SHA3-512"),
+    ('BLAKE2B', "BLAKE2b (Fast)"),
+    ('SHA1', "SHA1"),
+    ('MD5', "MD5 (Legacy)"),
+]
+DIST_CHOICES = [
+    ('ZSYNC', "zsync (.zsync delta downloads)"),
+    ('TORRENT', "BitTorrent v1/v2 (.torrent)"),
+]
+WEB_SEEDS_TIP = ("Mirror URLs the .torrent lists as HTTP web seeds, separated by commas or spaces.\n"
+                 "A URL ending in '/' is a mirror directory; the ISO file name is appended to it.")
+TRACKERS_TIP = "Tracker announce URLs for the .torrent, separated by commas or spaces (first one is primary)."
+ZSYNC_UNAVAILABLE_TIP = ("zsync needs the zsyncmake tool, or MD4 in OpenSSL (legacy provider).\n"
+                         "Install zsync to enable this option.")
+
+
+# Grey out the zsync option when nothing on this system can produce it.
+def disable_if_zsync_unavailable(checkbox):
+    if not zsync_available():
+        checkbox.setChecked(False)
+        checkbox.setEnabled(False)
+        checkbox.setToolTip(ZSYNC_UNAVAILABLE_TIP)
+
+# Helper function to split a comma/space separated URL field into a list.
+def parse_url_list(text):
+    return [url for url in text.replace(",", " ").split() if url]
+
+# Helper function to find the first URL without an allowed scheme (None when the list is valid).
+def invalid_url(urls, schemes=("http://", "https://")):
+    for url in urls:
+        if not url.lower().startswith(schemes):
+            return url
+    return None
 
 # --- Threading Class for Non-Blocking Operation ---
 class SignerThread(QThread):
@@ -24,12 +66,22 @@ class SignerThread(QThread):
     progress_signal = pyqtSignal(int)
     finished_signal = pyqtSignal(tuple) # (report, dest_dir)
     error_signal = pyqtSignal(str)
+    throughput_signal = pyqtSignal(float) # bytes per second while hashing
+    cancelled_signal = pyqtSignal()
 
-    def __init__(self, iso_path, output_dir, hash_algs):
+    def __init__(self, iso_path, output_dir, hash_algs, dist_formats=None, web_seeds=None, trackers=None):
         super().__init__()
         self.iso_path = iso_path
         self.output_dir = output_dir
         self.hash_algs = hash_algs
+        self.dist_formats = dist_formats or []
+        self.web_seeds = web_seeds or []
+        self.trackers = trackers or []
+        self.cancel_event = threading.Event()
+        self.outcome = None # (status, error, dest_dir) once run() has returned
+
+    def cancel(self):
+        self.cancel_event.set()
 
     def run(self):
         try:
@@ -38,10 +90,21 @@ class SignerThread(QThread):
                 self.output_dir,
                 self.hash_algs,
                 log_callback=self.log_signal.emit,
-                progress_callback=self.progress_signal.emit
+                progress_callback=self.progress_signal.emit,
+                dist_formats=self.dist_formats,
+                cancel_event=self.cancel_event,
+                throughput_callback=self.throughput_signal.emit,
+                web_seeds=self.web_seeds,
+                trackers=self.trackers
             )
+            self.outcome = (DONE, "", str(dest_dir))
             self.finished_signal.emit((report, str(dest_dir)))
+        except SigningCancelled:
+            self.outcome = (CANCELLED, "", "")
+            self.cancelled_signal.emit()
+            self.log_signal.emit("Process cancelled.")
         except Exception as e:
+            self.outcome = (FAILED, str(e), "")
             self.error_signal.emit(str(e))
             self.log_signal.emit(f"ERROR: Process failed: {e}")
 
@@ -79,14 +142,27 @@ class SignerApp(QMainWindow):
         self.tab_widget = QTabWidget()
         self.setCentralWidget(self.tab_widget)
 
+        self.job_queue = JobQueue()
+        try:
+            self.job_queue.load()
+        except (OSError, ValueError, TypeError) as e:
+            QMessageBox.warning(self, "Queue Error", f"Could not restore the saved job queue: {e}")
+        self.queue_threads = {} # job_id -> SignerThread
+        self.queue_running = False
+        self.closing = False
+
         self.init_sign_tab()
+        self.init_queue_tab()
         self.init_verify_tab()
 
         self.tab_widget.addTab(self.sign_tab, "🚀 Sign ISO")
+        self.tab_widget.addTab(self.queue_tab, "📋 Job Queue")
         self.tab_widget.addTab(self.verify_tab, "🔍 Verify ISO")
         
         self.signer_thread = None
+        self.signer_devices = set() # physical disks used by the Sign tab run, busy for the scheduler
         self.verify_thread = None
+        self.refresh_queue_table()
         
     # --- Sign Tab Setup ---
     def init_sign_tab(self):
@@ -139,6 +215,26 @@ class SignerApp(QMainWindow):
         
         hash_group.setLayout(hash_layout)
         self.sign_layout.addWidget(hash_group)
+
+        # 3b. Distribution Metadata Group (generated during the same hashing pass)
+        dist_group = QGroupBox("Distribution Metadata")
+        dist_layout = QGridLayout(dist_group)
+        self.dist_zsync = QCheckBox("zsync (.zsync delta downloads)")
+        disable_if_zsync_unavailable(self.dist_zsync)
+        self.dist_torrent = QCheckBox("BitTorrent v1/v2 (.torrent)")
+        self.web_seeds_input = QLineEdit()
+        self.web_seeds_input.setPlaceholderText("https://mirror.example.org/helwan/ ...")
+        self.web_seeds_input.setToolTip(WEB_SEEDS_TIP)
+        self.trackers_input = QLineEdit()
+        self.trackers_input.setPlaceholderText("udp://tracker.example.org:6969/announce ...")
+        self.trackers_input.setToolTip(TRACKERS_TIP)
+        dist_layout.addWidget(self.dist_zsync, 0, 0)
+        dist_layout.addWidget(self.dist_torrent, 0, 1)
+        dist_layout.addWidget(QLabel("Torrent Web Seeds:"), 1, 0)
+        dist_layout.addWidget(self.web_seeds_input, 1, 1)
+        dist_layout.addWidget(QLabel("Torrent Trackers:"), 2, 0)
+        dist_layout.addWidget(self.trackers_input, 2, 1)
+        self.sign_layout.addWidget(dist_group)
         
         # 4. Progress Bar (Global Progress)
         self.progress_bar = QProgressBar()
@@ -174,6 +270,100 @@ class SignerApp(QMainWindow):
         output_row_layout.addWidget(self.open_folder_button)
         self.sign_layout.addLayout(output_row_layout)
         
+    # --- Job Queue Tab Setup ---
+    def init_queue_tab(self):
+        self.queue_tab = QWidget()
+        self.queue_layout = QVBoxLayout(self.queue_tab)
+
+        # 1. New job: ISO + output root
+        self.queue_iso_input = QLineEdit()
+        self.queue_iso_input.setPlaceholderText("Select the ISO file to enqueue...")
+        queue_iso_button = QPushButton("Browse ISO")
+        queue_iso_button.clicked.connect(lambda: self.browse_file(self.queue_iso_input, "ISO Files (*.iso)"))
+        iso_layout = QHBoxLayout()
+        iso_layout.addWidget(QLabel("ISO File:"))
+        iso_layout.addWidget(self.queue_iso_input)
+        iso_layout.addWidget(queue_iso_button)
+        self.queue_layout.addLayout(iso_layout)
+
+        self.queue_output_input = QLineEdit(QDir.currentPath() + "/release")
+        queue_output_button = QPushButton("Browse Output Dir")
+        queue_output_button.clicked.connect(self.browse_queue_output_dir)
+        output_layout = QHBoxLayout()
+        output_layout.addWidget(QLabel("Output Root Directory:"))
+        output_layout.addWidget(self.queue_output_input)
+        output_layout.addWidget(queue_output_button)
+        self.queue_layout.addLayout(output_layout)
+
+        # 2. Per-job algorithm set
+        options_group = QGroupBox("Job Algorithms")
+        options_layout = QGridLayout(options_group)
+        self.queue_hash_boxes = {}
+        for i, (algo, label) in enumerate(HASH_CHOICES):
+            box = QCheckBox(label)
+            box.setChecked(algo == 'SHA256')
+            self.queue_hash_boxes[algo] = box
+            options_layout.addWidget(box, i // 4, i % 4)
+        self.queue_dist_boxes = {}
+        for i, (fmt, label) in enumerate(DIST_CHOICES):
+            box = QCheckBox(label)
+            if fmt == 'ZSYNC':
+                disable_if_zsync_unavailable(box)
+            self.queue_dist_boxes[fmt] = box
+            options_layout.addWidget(box, 2, i * 2, 1, 2)
+        self.queue_web_seeds_input = QLineEdit()
+        self.queue_web_seeds_input.setPlaceholderText("https://mirror.example.org/helwan/ ...")
+        self.queue_web_seeds_input.setToolTip(WEB_SEEDS_TIP)
+        self.queue_trackers_input = QLineEdit()
+        self.queue_trackers_input.setPlaceholderText("udp://tracker.example.org:6969/announce ...")
+        self.queue_trackers_input.setToolTip(TRACKERS_TIP)
+        options_layout.addWidget(QLabel("Torrent Web Seeds:"), 3, 0)
+        options_layout.addWidget(self.queue_web_seeds_input, 3, 1, 1, 3)
+        options_layout.addWidget(QLabel("Torrent Trackers:"), 4, 0)
+        options_layout.addWidget(self.queue_trackers_input, 4, 1, 1, 3)
+        self.queue_layout.addWidget(options_group)
+
+        add_button = QPushButton("➕ Add to Queue")
+        add_button.clicked.connect(self.enqueue_job)
+        self.queue_layout.addWidget(add_button)
+
+        # 3. Scheduler controls
+        control_layout = QHBoxLayout()
+        cpu_count = os.cpu_count() or 1
+        self.max_jobs_spin = QSpinBox()
+        self.max_jobs_spin.setRange(1, cpu_count)
+        self.max_jobs_spin.setValue(self.job_queue.max_concurrent)
+        self.max_jobs_spin.valueChanged.connect(self.on_max_jobs_changed)
+        self.queue_start_button = QPushButton("▶ Start Queue")
+        self.queue_start_button.clicked.connect(self.toggle_queue)
+        control_layout.addWidget(QLabel("Max concurrent jobs:"))
+        control_layout.addWidget(self.max_jobs_spin)
+        control_layout.addStretch(1)
+        control_layout.addWidget(self.queue_start_button)
+        self.queue_layout.addLayout(control_layout)
+
+        # 4. Job table
+        self.queue_table = QTableWidget(0, 6)
+        self.queue_table.setHorizontalHeaderLabels(["ISO", "Algorithms", "Status", "Progress", "Throughput", "Release Dir"])
+        self.queue_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.queue_table.horizontalHeader().setStretchLastSection(True)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queue_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.queue_layout.addWidget(self.queue_table)
+
+        # 5. Job actions
+        actions_layout = QHBoxLayout()
+        for label, handler in (
+            ("Cancel", self.cancel_selected_jobs),
+            ("Retry", self.retry_selected_jobs),
+            ("Remove", self.remove_selected_jobs),
+            ("Clear Finished", self.clear_finished_jobs),
+        ):
+            button = QPushButton(label)
+            button.clicked.connect(handler)
+            actions_layout.addWidget(button)
+        self.queue_layout.addLayout(actions_layout)
+
     # --- Verify Tab Setup ---
     def init_verify_tab(self):
         self.verify_tab = QWidget()
@@ -245,6 +435,12 @@ class SignerApp(QMainWindow):
         if self.hash_sha1.isChecked(): hash_algs.append('SHA1')
         if self.hash_md5.isChecked(): hash_algs.append('MD5')
 
+        dist_formats = []
+        if self.dist_zsync.isChecked(): dist_formats.append('ZSYNC')
+        if self.dist_torrent.isChecked(): dist_formats.append('TORRENT')
+        web_seeds = parse_url_list(self.web_seeds_input.text())
+        trackers = parse_url_list(self.trackers_input.text())
+
         if not iso_path or not os.path.isfile(iso_path):
             QMessageBox.warning(self, "Invalid File", "Please select a valid ISO file before starting.")
             return
@@ -254,6 +450,18 @@ class SignerApp(QMainWindow):
         if not hash_algs:
             QMessageBox.warning(self, "Hash Error", "Please select at least one hash algorithm.")
             return
+        if not self.check_torrent_urls(web_seeds, trackers):
+            return
+
+        devices = job_devices(iso_path, output_dir)
+        if any(job.devices & devices for job in self.job_queue.jobs if job.status == RUNNING):
+            answer = QMessageBox.question(
+                self, "Disk Busy",
+                "A queued job is already signing on the same disk; running both at once will slow them down.\n"
+                "Start anyway? (Add it to the Job Queue to run it afterwards.)")
+            if answer != QMessageBox.Yes:
+                return
+        self.signer_devices = devices
 
         # Disable controls during operation
         self.sign_button.setEnabled(False)
@@ -267,12 +475,26 @@ class SignerApp(QMainWindow):
         self.open_folder_button.setEnabled(False)
         
         # Initialize and start the thread
-        self.signer_thread = SignerThread(iso_path, output_dir, hash_algs)
+        self.signer_thread = SignerThread(iso_path, output_dir, hash_algs, dist_formats, web_seeds, trackers)
         self.signer_thread.log_signal.connect(self.log_to_gui)
         self.signer_thread.progress_signal.connect(self.progress_bar.setValue)
         self.signer_thread.finished_signal.connect(self.on_signing_finished)
         self.signer_thread.error_signal.connect(self.on_signing_error)
+        self.signer_thread.cancelled_signal.connect(self.on_signing_cancelled)
+        self.signer_thread.finished.connect(self.schedule_jobs) # its disks are free again
         self.signer_thread.start()
+        self.schedule_jobs()
+
+    def check_torrent_urls(self, web_seeds, trackers):
+        bad = invalid_url(web_seeds)
+        if bad:
+            QMessageBox.warning(self, "Invalid Web Seed", f"Web seeds must be http(s) URLs: {bad}")
+            return False
+        bad = invalid_url(trackers, ("http://", "https://", "udp://"))
+        if bad:
+            QMessageBox.warning(self, "Invalid Tracker", f"Trackers must be http(s) or udp URLs: {bad}")
+            return False
+        return True
 
     def log_to_gui(self, message):
         self.log_output.append(message)
@@ -304,6 +526,16 @@ class SignerApp(QMainWindow):
         self.browse_output_button.setEnabled(True)
         self.open_folder_button.setEnabled(False)
 
+    def on_signing_cancelled(self):
+        self.log_output.append("Signing cancelled; the incomplete release folder was removed.")
+        self.progress_bar.setValue(0)
+
+        # Re-enable controls
+        self.sign_button.setEnabled(True)
+        self.browse_iso_button.setEnabled(True)
+        self.browse_output_button.setEnabled(True)
+        self.open_folder_button.setEnabled(False)
+
     def open_output_folder(self):
         folder_path = self.output_path_display.text()
         if not folder_path or not os.path.isdir(folder_path):
@@ -317,6 +549,172 @@ class SignerApp(QMainWindow):
         else: # linux
             subprocess.Popen(["xdg-open", folder_path])
             
+    # --- Job Queue Functions ---
+    def browse_queue_output_dir(self):
+        dir_path = QFileDialog.getExistingDirectory(self, "Select Output Directory", self.queue_output_input.text())
+        if dir_path:
+            self.queue_output_input.setText(dir_path)
+
+    def enqueue_job(self):
+        iso_path = self.queue_iso_input.text()
+        output_dir = self.queue_output_input.text()
+        hash_algs = [algo for algo, box in self.queue_hash_boxes.items() if box.isChecked()]
+        dist_formats = [fmt for fmt, box in self.queue_dist_boxes.items() if box.isChecked()]
+        web_seeds = parse_url_list(self.queue_web_seeds_input.text())
+        trackers = parse_url_list(self.queue_trackers_input.text())
+
+        if not iso_path or not os.path.isfile(iso_path):
+            QMessageBox.warning(self, "Invalid File", "Please select a valid ISO file before enqueuing.")
+            return
+        if not output_dir:
+            QMessageBox.warning(self, "Invalid Directory", "Please specify a valid output directory.")
+            return
+        if not hash_algs:
+            QMessageBox.warning(self, "Hash Error", "Please select at least one hash algorithm.")
+            return
+        if not self.check_torrent_urls(web_seeds, trackers):
+            return
+
+        self.job_queue.add(SigningJob(iso_path, output_dir, hash_algs, dist_formats, web_seeds, trackers))
+        self.queue_iso_input.clear()
+        self.refresh_queue_table()
+        self.schedule_jobs()
+
+    def selected_jobs(self):
+        rows = sorted({index.row() for index in self.queue_table.selectionModel().selectedRows()})
+        return [self.job_queue.jobs[row] for row in rows if row < len(self.job_queue.jobs)]
+
+    def refresh_queue_table(self):
+        self.queue_progress_bars = {}
+        self.queue_table.setRowCount(len(self.job_queue.jobs))
+        for row, job in enumerate(self.job_queue.jobs):
+            algs = ", ".join(job.hash_algs + [fmt.lower() for fmt in job.dist_formats])
+            self.queue_table.setItem(row, 0, QTableWidgetItem(os.path.basename(job.iso_path)))
+            self.queue_table.setItem(row, 1, QTableWidgetItem(algs))
+            status_item = QTableWidgetItem(job.status)
+            if job.error:
+                status_item.setToolTip(job.error)
+            self.queue_table.setItem(row, 2, status_item)
+            bar = QProgressBar()
+            bar.setValue(job.progress)
+            self.queue_table.setCellWidget(row, 3, bar)
+            self.queue_progress_bars[job.job_id] = bar
+            self.queue_table.setItem(row, 4, QTableWidgetItem(self.format_throughput(job.throughput)))
+            self.queue_table.setItem(row, 5, QTableWidgetItem(job.dest_dir))
+
+    def format_throughput(self, bytes_per_sec):
+        if not bytes_per_sec:
+            return ""
+        return f"{bytes_per_sec / (1024 * 1024):.1f} MB/s"
+
+    def update_job_row(self, job):
+        row = self.job_queue.jobs.index(job)
+        self.queue_table.item(row, 4).setText(self.format_throughput(job.throughput))
+        bar = self.queue_progress_bars.get(job.job_id)
+        if bar is not None:
+            bar.setValue(job.progress)
+
+    def toggle_queue(self):
+        self.queue_running = not self.queue_running
+        self.queue_start_button.setText("⏸ Pause Queue" if self.queue_running else "▶ Start Queue")
+        self.schedule_jobs()
+
+    def on_max_jobs_changed(self, value):
+        self.job_queue.max_concurrent = value
+        self.schedule_jobs()
+
+    # Start every job the scheduler allows right now (CPU limit + one job per physical device).
+    def schedule_jobs(self):
+        if not self.queue_running or self.closing:
+            return
+        busy_devices, busy_slots = set(), 0
+        if self.signer_thread is not None and self.signer_thread.isRunning():
+            busy_devices, busy_slots = self.signer_devices, 1
+        for job in self.job_queue.runnable_jobs(busy_devices, busy_slots):
+            thread = SignerThread(job.iso_path, job.output_dir, job.hash_algs, job.dist_formats,
+                                  job.web_seeds, job.trackers)
+            thread.progress_signal.connect(lambda value, job=job: self.on_job_progress(job, value))
+            thread.throughput_signal.connect(lambda rate, job=job: self.on_job_throughput(job, rate))
+            # QThread.finished fires after run() has returned, so thread.outcome is set
+            thread.finished.connect(lambda job=job: self.on_job_finished(job))
+            self.queue_threads[job.job_id] = thread
+            job.progress, job.throughput = 0, 0.0
+            self.job_queue.set_status(job, RUNNING)
+            thread.start()
+        self.refresh_queue_table()
+
+    def on_job_progress(self, job, value):
+        job.progress = value
+        self.update_job_row(job)
+
+    def on_job_throughput(self, job, rate):
+        job.throughput = rate
+        self.update_job_row(job)
+
+    def on_job_finished(self, job):
+        if self.closing:
+            return # closeEvent records the outcome itself
+        self.record_job_outcome(job)
+        self.refresh_queue_table()
+        self.schedule_jobs()
+
+    # Save the outcome of a job's finished thread; a job stopped by app shutdown goes back to the queue.
+    def record_job_outcome(self, job, shutting_down=False):
+        thread = self.queue_threads.pop(job.job_id, None)
+        if thread is None:
+            return
+        thread.wait()
+        status, error, dest_dir = thread.outcome or (FAILED, "Signing thread ended unexpectedly.", "")
+        if status == CANCELLED and shutting_down:
+            job.progress = 0
+            status = QUEUED
+        if job in self.job_queue.jobs:
+            self.job_queue.set_status(job, status, error=error, dest_dir=dest_dir)
+
+    def cancel_selected_jobs(self):
+        for job in self.selected_jobs():
+            if job.status == RUNNING:
+                self.queue_threads[job.job_id].cancel()
+            elif job.status == QUEUED:
+                self.job_queue.set_status(job, CANCELLED)
+        self.refresh_queue_table()
+
+    def retry_selected_jobs(self):
+        for job in self.selected_jobs():
+            self.job_queue.retry(job.job_id)
+        self.refresh_queue_table()
+        self.schedule_jobs()
+
+    def remove_selected_jobs(self):
+        for job in self.selected_jobs():
+            self.job_queue.remove(job.job_id)
+        self.refresh_queue_table()
+
+    def clear_finished_jobs(self):
+        for job in [job for job in self.job_queue.jobs if job.status in FINISHED_STATES]:
+            self.job_queue.remove(job.job_id)
+        self.refresh_queue_table()
+
+    def closeEvent(self, event):
+        # Stop every running job (gpg, hashing and the ISO copy all honour cancel) and wait until the
+        # threads have really exited. Jobs that completed meanwhile keep their result; interrupted
+        # ones are re-queued.
+        self.closing = True
+        threads = list(self.queue_threads.values())
+        if self.signer_thread is not None and self.signer_thread.isRunning():
+            threads.append(self.signer_thread)
+        for thread in threads:
+            thread.cancel()
+        for thread in threads:
+            thread.wait()
+        for job_id in list(self.queue_threads):
+            job = self.job_queue.get(job_id)
+            if job is not None:
+                self.record_job_outcome(job, shutting_down=True)
+        if self.verify_thread is not None:
+            self.verify_thread.wait()
+        event.accept()
+
     # --- Verify Functions (Unchanged) ---
     def start_verification(self):
         iso_path = self.verify_iso_input.text()
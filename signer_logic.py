@@ -3,46 +3,83 @@
 signer_logic.py
 Contains the core GPG signing and hashing logic for the Helwan ISO Signer GUI.
 - SUPPORTS: SHA256, SHA512, SHA1, MD5, SHA3-512, BLAKE2B
+- Optional distribution metadata (.zsync, hybrid v1/v2 .torrent) from the same hashing pass.
+- Writes text + JSON reports and records every release in the output root's SQLite catalog.
 - Includes comprehensive progress tracking for the entire process.
 """
-import subprocess, sys, hashlib, textwrap, tempfile, shutil, os
+import subprocess, sys, hashlib, textwrap, tempfile, shutil, os, json, time, threading
 from pathlib import Path
 from datetime import datetime
 
+from dist_metadata import ZsyncBuilder, TorrentGenerator, zsync_available
+from release_catalog import ReleaseCatalog
+
+# Raised when a queued job is cancelled while signing is in progress.
+class SigningCancelled(RuntimeError):
+    pass
+
+# Serializes key lookup/auto-generation when several jobs sign concurrently.
+_key_lock = threading.Lock()
+
+# Helper function to run a command; with a cancel_event the process is terminated as soon as it is set.
+def _run_process(cmd, cancel_event=None):
+    if cancel_event is None:
+        return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    while True:
+        try:
+            out, err = proc.communicate(timeout=0.2)
+            return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+        except subprocess.TimeoutExpired:
+            if not cancel_event.is_set():
+                continue
+            proc.terminate()
+            try:
+                proc.communicate(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+            raise SigningCancelled(f"Signing cancelled while running: {cmd[0]}")
+
 # Helper function to run system commands.
-def run(cmd, capture=False, check=True, log_callback=None):
+def run(cmd, capture=False, check=True, log_callback=None, cancel_event=None):
     if log_callback:
         log_callback(f"Executing: {' '.join(cmd)}")
     
     if capture:
-        p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        p = _run_process(cmd, cancel_event)
         if check and p.returncode != 0:
             raise RuntimeError(f"Command failed: {' '.join(cmd)}\n{p.stderr.strip()}")
         return p.stdout
     else:
-        p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        p = _run_process(cmd, cancel_event)
         if check and p.returncode != 0:
             raise RuntimeError(f"Command failed: {' '.join(cmd)} (exit {p.returncode})\n{p.stderr.strip()}")
         if log_callback:
              log_callback(f"Command Output:\n{p.stdout.strip()}")
         return None
 
-# Function to compute the hash of a large file efficiently with global progress updates.
-def compute_hash(path, algo, log_callback, total_progress_start, total_progress_end, total_progress_callback):
-    h = algo()
-    file_size = os.path.getsize(path)
+# Function to stream a large file once through every hashing consumer with global progress updates.
+# Consumers only need an update(chunk) method (hashlib objects, zsync/torrent generators).
+def compute_hashes(path, consumers, log_callback, total_progress_start, total_progress_end, total_progress_callback,
+                   cancel_event=None, throughput_callback=None):
+    file_size = os.path.getsize(path) or 1
     bytes_read = 0
+    started = time.monotonic()
     chunk_size = 1024 * 1024 # 1MB chunk
     total_progress_range = total_progress_end - total_progress_start
     
-    log_callback(f"Calculating {algo.__name__.upper()}...")
+    log_callback(f"Calculating {', '.join(consumers)} in a single pass...")
 
     with open(path, "rb") as f:
         while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise SigningCancelled("Signing cancelled during hashing.")
             chunk = f.read(chunk_size)
             if not chunk:
                 break
-            h.update(chunk)
+            for consumer in consumers.values():
+                consumer.update(chunk)
             bytes_read += len(chunk)
             
             # Send global progress update
@@ -50,8 +87,42 @@ def compute_hash(path, algo, log_callback, total_progress_start, total_progress_
                 hash_percent_local = (bytes_read / file_size)
                 global_progress = total_progress_start + (hash_percent_local * total_progress_range)
                 total_progress_callback(int(global_progress))
+            if throughput_callback:
+                elapsed = time.monotonic() - started
+                if elapsed > 0:
+                    throughput_callback(bytes_read / elapsed)
                 
-    return h.hexdigest()
+    return consumers
+
+# Function to copy a large file in chunks so a cancel request is honoured mid-copy.
+def copy_file(src, dst, cancel_event=None, chunk_size=8 * 1024 * 1024):
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise SigningCancelled("Signing cancelled while copying the ISO.")
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                break
+            fout.write(chunk)
+    shutil.copystat(src, dst)
+
+# Function to describe which source image a release came from (ISO 9660 volume label + file stamp).
+def read_iso_identity(path):
+    path = Path(path)
+    volume_id = None
+    try:
+        with open(path, "rb") as f:
+            f.seek(16 * 2048) # Primary Volume Descriptor
+            pvd = f.read(72)
+        if len(pvd) == 72 and pvd[0] == 1 and pvd[1:6] == b"CD001":
+            volume_id = pvd[40:72].decode("ascii", "replace").strip() or None
+    except OSError:
+        pass
+    return {
+        "volume_id": volume_id,
+        "source_path": str(path.resolve()),
+        "source_mtime": os.path.getmtime(path),
+    }
 
 # [GPG Key Management functions: find_existing_secret_fpr, generate_no_pass_key, export_pubkey, extract_fpr_from_pubkey - Unchanged]
 
@@ -121,7 +192,8 @@ def verify_iso_signature(iso_path_str, sig_path_str, log_callback):
 
 
 # The main execution function
-def execute_signing_process(iso_path_str, output_dir_str, hash_algorithms, log_callback, progress_callback):
+def execute_signing_process(iso_path_str, output_dir_str, hash_algorithms, log_callback, progress_callback, dist_formats=None,
+                            cancel_event=None, throughput_callback=None, web_seeds=None, trackers=None):
     
     # 0. Initial Setup and Validation (0% - 5%)
     progress_callback(0)
@@ -142,11 +214,26 @@ def execute_signing_process(iso_path_str, output_dir_str, hash_algorithms, log_c
         dest_dir = base_output_dir / f"{iso_basename}_{ts}"
     dest_dir.mkdir(parents=True, exist_ok=False)
 
+    try:
+        return _build_release(iso_path, base_output_dir, dest_dir, hash_algorithms, log_callback, progress_callback,
+                              dist_formats, cancel_event, throughput_callback, web_seeds, trackers)
+    except SigningCancelled:
+        # A cancelled run leaves nothing behind; Retry starts again in a fresh folder
+        shutil.rmtree(dest_dir, ignore_errors=True)
+        log_callback(f"Removed incomplete release folder: {dest_dir}")
+        raise
+
+
+# Signing stages 1-7, writing everything into the freshly created release folder.
+def _build_release(iso_path, base_output_dir, dest_dir, hash_algorithms, log_callback, progress_callback,
+                   dist_formats, cancel_event, throughput_callback, web_seeds, trackers):
+
     # Define output file paths
     sig_bin = dest_dir / (iso_path.name + ".sig")
     sig_asc = dest_dir / (iso_path.name + ".sig.asc")
     pubkey_file = dest_dir / "helwan-key.asc"
     report_file = dest_dir / f"{iso_path.name}.report.txt"
+    report_json_file = dest_dir / f"{iso_path.name}.report.json"
     log_file = dest_dir / "sign_iso.log"
 
     def file_log(msg):
@@ -157,50 +244,63 @@ def execute_signing_process(iso_path_str, output_dir_str, hash_algorithms, log_c
         file_log(msg)
         log_callback(msg)
 
+    # Wall-clock seconds spent in each stage, stored in the JSON report and the catalog
+    timings = {}
+    stage_clock = [time.monotonic()]
+
+    def mark_stage(stage):
+        now = time.monotonic()
+        timings[stage] = round(now - stage_clock[0], 3)
+        stage_clock[0] = now
+        if cancel_event is not None and cancel_event.is_set():
+            combined_log(f"Cancelled after stage: {stage}")
+            raise SigningCancelled(f"Signing cancelled after stage: {stage}")
+
     combined_log("Starting process")
     combined_log(f"Working — The output will be in: {dest_dir.resolve()}")
+    mark_stage("setup")
     progress_callback(5) # 5% complete
 
     # 1. Identify or Generate Secret Key (5% - 10%)
-    fpr = find_existing_secret_fpr()
-    if not fpr:
-        fpr = generate_no_pass_key(combined_log)
+    with _key_lock:
+        fpr = find_existing_secret_fpr()
+        if not fpr:
+            fpr = generate_no_pass_key(combined_log)
     if not fpr:
         raise RuntimeError("No secret key found and none was generated.")
         
     long_key_id = fpr[-16:]
     combined_log(f"Using key FPR={fpr} LONG={long_key_id}")
+    mark_stage("key")
     progress_callback(10) # 10% complete
 
     # 2. Create Detached Signatures (10% - 20%)
     combined_log("Creating signatures...")
     try:
-        run(["gpg", "--output", str(sig_bin), "--detach-sign", "--local-user", fpr, str(iso_path)], log_callback=combined_log)
-        run(["gpg", "--armor", "--output", str(sig_asc), "--detach-sign", "--local-user", fpr, str(iso_path)], log_callback=combined_log)
+        run(["gpg", "--output", str(sig_bin), "--detach-sign", "--local-user", fpr, str(iso_path)],
+            log_callback=combined_log, cancel_event=cancel_event)
+        run(["gpg", "--armor", "--output", str(sig_asc), "--detach-sign", "--local-user", fpr, str(iso_path)],
+            log_callback=combined_log, cancel_event=cancel_event)
         combined_log("Signatures created successfully.")
+    except SigningCancelled:
+        combined_log("Cancelled while signing.")
+        raise
     except Exception as e:
         raise RuntimeError(f"Failed to create signature via gpg. (Is key protected by a passphrase?): {e}")
+    mark_stage("sign")
     progress_callback(20) # 20% complete
 
     # 3. Export Public Key (20% - 25%)
     combined_log(f"Exporting Public Key to: {pubkey_file.name}")
     export_pubkey(fpr, pubkey_file, combined_log)
     combined_log(f"Public key exported: {pubkey_file}")
+    mark_stage("export_key")
     progress_callback(25) # 25% complete
 
-    # 4. Calculate Hashes (25% - 85%) - Longest step
+    # 4. Calculate Hashes and Distribution Metadata (25% - 85%) - Longest step, single read of the ISO
     combined_log("Calculating hashes (may take a while)...")
     
-    hash_results = {}
-    
-    # Define progress distribution for hashing (60% of total)
-    hash_progress_total_range = 85 - 25
-    hash_count = len(hash_algorithms)
-    if hash_count == 0:
-         hash_count = 1
-    hash_progress_per_algo = hash_progress_total_range / hash_count 
-    current_hash_progress_start = 25
-    
+    consumers = {}
     for algo_name in hash_algorithms:
         algo_upper = algo_name.upper()
         
@@ -220,29 +320,77 @@ def execute_signing_process(iso_path_str, output_dir_str, hash_algorithms, log_c
         else:
             combined_log(f"Warning: Unsupported hash algorithm skipped: {algo_upper}")
             continue
+        consumers[algo_upper] = algo_func()
 
-        current_hash_progress_end = current_hash_progress_start + hash_progress_per_algo
-        
-        hash_results[algo_upper] = compute_hash(
-            iso_path, 
-            algo_func, 
-            combined_log, 
-            current_hash_progress_start, 
-            current_hash_progress_end, 
-            progress_callback
-        )
-        current_hash_progress_start = current_hash_progress_end 
+    # zsync is fed from the digest pass but computed in its own process (zsyncmake or the built-in generator)
+    zsync_builder = None
+    dist_skipped = {} # requested formats that could not be produced -> reason
+    for fmt_name in dist_formats or []:
+        fmt_upper = fmt_name.upper()
+        if fmt_upper == 'ZSYNC':
+            if not zsync_available():
+                dist_skipped[fmt_upper] = "zsyncmake is not installed and MD4 is not available in this OpenSSL build"
+                combined_log(f"Warning: zsync skipped — {dist_skipped[fmt_upper]}.")
+                continue
+            zsync_builder = ZsyncBuilder(iso_path, dest_dir / (iso_path.name + ".zsync")).start()
+            consumers[fmt_upper] = zsync_builder
+            combined_log(f"zsync generation started in the background ({zsync_builder.tool}).")
+        elif fmt_upper == 'TORRENT':
+            # Mirror web seeds (BEP 19) let clients fall back to HTTP when no peers are found
+            consumers[fmt_upper] = TorrentGenerator(iso_path, trackers=trackers, web_seeds=web_seeds)
+        else:
+            dist_skipped[fmt_upper] = "unsupported format"
+            combined_log(f"Warning: Unsupported distribution format skipped: {fmt_upper}")
+
+    try:
+        if consumers:
+            try:
+                compute_hashes(iso_path, consumers, combined_log, 25, 85, progress_callback,
+                               cancel_event=cancel_event, throughput_callback=throughput_callback)
+            except SigningCancelled:
+                combined_log("Cancelled during hashing.")
+                raise
+
+        hash_results = {}
+        dist_results = {}
+        for name, consumer in consumers.items():
+            if name == 'ZSYNC':
+                continue # collected from the worker below
+            if name == 'TORRENT':
+                out_path = dest_dir / (iso_path.name + ".torrent")
+            else:
+                hash_results[name] = consumer.hexdigest()
+                continue
+            dist_results[name] = (out_path, consumer.write(out_path))
+            combined_log(f"{name} metadata written: {out_path.name}")
 
+        if zsync_builder is not None:
+            combined_log("Waiting for zsync generation to finish...")
+            try:
+                details = zsync_builder.wait(cancel_event)
+            except RuntimeError as e:
+                dist_skipped['ZSYNC'] = str(e)
+                combined_log(f"Warning: zsync skipped — {e}")
+            else:
+                if details is not None:
+                    dist_results['ZSYNC'] = (zsync_builder.outpath, details)
+                    combined_log(f"ZSYNC metadata written: {zsync_builder.outpath.name}")
+    finally:
+        if zsync_builder is not None:
+            zsync_builder.terminate() # stops the worker if the digest pass failed or was cancelled
+
+    mark_stage("hash")
     progress_callback(85)
     combined_log("All selected hashes calculated.")
 
     # 5. Extract FPR and Save the Report (85% - 90%)
     fpr_from_pub = extract_fpr_from_pubkey(pubkey_file) or fpr
+    generated = f"{datetime.utcnow().isoformat()}Z"
 
     report_lines = [
         f"File: {iso_path.name}",
         f"Size: {os.path.getsize(iso_path)} bytes",
-        f"Generated: {datetime.utcnow().isoformat()}Z",
+        f"Generated: {generated}",
         f"Release dir: {dest_dir.resolve()}",
         "",
         "--- Signatures and Key ---",
@@ -255,6 +403,15 @@ def execute_signing_process(iso_path_str, output_dir_str, hash_algorithms, log_c
     
     for algo, hex_digest in hash_results.items():
         report_lines.append(f"{algo}: {hex_digest}")
+
+    if dist_results or dist_skipped:
+        report_lines.extend(["", "--- Distribution Metadata ---"])
+        for fmt, (out_path, details) in dist_results.items():
+            report_lines.append(f"{fmt}: {out_path.name}")
+            for key, value in details.items():
+                report_lines.append(f"  {key}: {value}")
+        for fmt, reason in dist_skipped.items():
+            report_lines.append(f"{fmt}: skipped ({reason})")
         
     report_lines.extend([
         "",
@@ -270,15 +427,58 @@ def execute_signing_process(iso_path_str, output_dir_str, hash_algorithms, log_c
     report = "\n".join(report_lines).strip()
     report_file.write_text(report, encoding="utf-8")
     combined_log("Report written.")
+    mark_stage("report")
     progress_callback(90) # 90% complete
 
-    # 6. Copy the ISO itself into the release folder (90% - 100%)
+    # 6. Copy the ISO itself into the release folder (90% - 95%)
     iso_copy_path = dest_dir / iso_path.name
     try:
-        shutil.copy2(iso_path, iso_copy_path)
+        copy_file(iso_path, iso_copy_path, cancel_event)
         combined_log(f"ISO copy placed at {iso_copy_path.name}")
+    except SigningCancelled:
+        combined_log("Cancelled while copying the ISO.")
+        raise
     except Exception:
         combined_log("Warning: Failed to copy the ISO to the release folder.")
+    mark_stage("copy")
+    progress_callback(95)
+
+    # 7. JSON Report and Release Catalog (95% - 100%)
+    artifacts = {
+        "signature": sig_bin,
+        "signature_armored": sig_asc,
+        "public_key": pubkey_file,
+        "report": report_file,
+        "report_json": report_json_file,
+        "log": log_file,
+    }
+    for fmt, (out_path, _) in dist_results.items():
+        artifacts[fmt.lower()] = out_path
+    if iso_copy_path.exists():
+        artifacts["iso"] = iso_copy_path
+
+    report_data = {
+        "file": iso_path.name,
+        "size": os.path.getsize(iso_path),
+        "generated": generated,
+        "release_dir": str(dest_dir.resolve()),
+        "identity": read_iso_identity(iso_path),
+        "hashes": hash_results,
+        "distribution": {fmt: dict(details, file=out_path.name) for fmt, (out_path, details) in dist_results.items()},
+        "distribution_skipped": dist_skipped,
+        "gpg": {"fingerprint": fpr_from_pub, "long_key_id": long_key_id},
+        "artifacts": {kind: str(path.resolve()) for kind, path in artifacts.items()},
+        "timings": timings,
+    }
+    report_json_file.write_text(json.dumps(report_data, indent=2), encoding="utf-8")
+    combined_log(f"JSON report written: {report_json_file.name}")
+
+    try:
+        with ReleaseCatalog(base_output_dir, create=True) as catalog:
+            catalog.record_release(report_data)
+        combined_log(f"Release recorded in catalog: {catalog.path}")
+    except Exception as e:
+        combined_log(f"Warning: Failed to record the release in the catalog: {e}")
         
     progress_callback(100)
     combined_log("Process finished successfully.")
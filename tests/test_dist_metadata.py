@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Deterministic checks for the hand-rolled distribution formats in dist_metadata.py.
+Run with: python3 -m pytest -q  (or python3 -m unittest discover tests)
+"""
+import hashlib, os, sys, tempfile, unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import dist_metadata as dm
+
+BLOCK = dm.TORRENT_BLOCK_SIZE
+MD4_AVAILABLE = dm.md4_available()
+_hashlib_new = hashlib.new
+
+
+def pattern(size):
+    return bytes((i * 7 + i // 251) & 0xFF for i in range(size))
+
+
+# Independent BEP 52 reference: hash every 16 KiB leaf, pad the whole tree with zero hashes.
+def reference_pieces_root(data, piece_length):
+    leaves = [hashlib.sha256(data[i:i + BLOCK]).digest() for i in range(0, len(data), BLOCK)]
+    if len(data) <= piece_length:
+        width = 1 << (len(leaves) - 1).bit_length()
+    else:
+        pieces = -(-len(data) // piece_length)
+        width = (1 << (pieces - 1).bit_length()) * (piece_length // BLOCK)
+    layer = leaves + [bytes(32)] * (width - len(leaves))
+    while len(layer) > 1:
+        layer = [hashlib.sha256(layer[i] + layer[i + 1]).digest() for i in range(0, len(layer), 2)]
+    return layer[0]
+
+
+# MD4 is often missing from OpenSSL 3; the zsync tests only check layout, so fall back to a stand-in.
+def md4_or_stand_in(name, data=b"", **kwargs):
+    if name == "md4" and not MD4_AVAILABLE:
+        return hashlib.sha256(data)
+    return _hashlib_new(name, data, **kwargs)
+
+
+class TempFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make_file(self, data, name="test.iso"):
+        path = Path(self.tmp.name) / name
+        path.write_bytes(data)
+        os.utime(path, (1700000000, 1700000000))
+        return path
+
+
+def feed(generator, data, chunk_size):
+    for i in range(0, len(data), chunk_size):
+        generator.update(data[i:i + chunk_size])
+    return generator
+
+
+class BencodeTests(unittest.TestCase):
+    def test_dict_keys_sorted_by_raw_bytes(self):
+        self.assertEqual(dm.bencode({"b": 1, "a": 2, "B": 3}), b"d1:Bi3e1:ai2e1:bi1ee")
+
+    def test_str_and_bytes_keys_sort_together(self):
+        self.assertEqual(dm.bencode({b"\x00": 1, "piece length": 2}), b"d1:\x00i1e12:piece lengthi2ee")
+
+    def test_nested_values(self):
+        self.assertEqual(dm.bencode({"l": [1, "x", b"yz"], "n": -3}), b"d1:lli1e1:x2:yze1:ni-3ee")
+
+    def test_rejects_booleans(self):
+        with self.assertRaises(TypeError):
+            dm.bencode(True)
+
+
+class TorrentTests(TempFileTestCase):
+    PIECE = 2 * BLOCK # two leaves per piece keeps the trees small
+
+    def build(self, data, chunk_size=7777):
+        gen = dm.TorrentGenerator(self.make_file(data), piece_length=self.PIECE)
+        return gen, feed(gen, data, chunk_size).finalize()
+
+    def test_last_piece_and_last_block_padding(self):
+        data = pattern(2 * self.PIECE + BLOCK + 100) # 3 pieces, the last one with a short leaf
+        gen, meta = self.build(data)
+        info = meta["info"]
+        root = info["file tree"]["test.iso"][""]["pieces root"]
+        self.assertEqual(root, reference_pieces_root(data, self.PIECE))
+        self.assertEqual(len(meta["piece layers"][root]), 3 * 32)
+        v1 = b"".join(hashlib.sha1(data[i:i + self.PIECE]).digest() for i in range(0, len(data), self.PIECE))
+        self.assertEqual(info["pieces"], v1)
+        self.assertEqual(info["length"], len(data))
+
+    def test_single_piece_file_has_no_piece_layers(self):
+        data = pattern(BLOCK + 10) # fits in one piece, two leaves
+        _, meta = self.build(data)
+        root = meta["info"]["file tree"]["test.iso"][""]["pieces root"]
+        self.assertEqual(meta["piece layers"], {})
+        self.assertEqual(root, reference_pieces_root(data, self.PIECE))
+
+    def test_chunk_size_does_not_change_output(self):
+        data = pattern(3 * self.PIECE + 5)
+        _, first = self.build(data, chunk_size=1000)
+        _, second = self.build(data, chunk_size=len(data))
+        self.assertEqual(first["info"], second["info"])
+        self.assertEqual(first["piece layers"], second["piece layers"])
+
+    def test_trackers_and_web_seeds(self):
+        data = pattern(BLOCK)
+        gen = dm.TorrentGenerator(self.make_file(data), piece_length=self.PIECE,
+                                  trackers=["udp://t1/announce", "https://t2/announce"],
+                                  web_seeds=["https://mirror.example.org/helwan/"])
+        meta = feed(gen, data, 4096).finalize()
+        self.assertEqual(meta["announce"], "udp://t1/announce")
+        self.assertEqual(meta["announce-list"], [["udp://t1/announce"], ["https://t2/announce"]])
+        self.assertEqual(meta["url-list"], ["https://mirror.example.org/helwan/"])
+
+    def test_no_sources_means_no_announce_keys(self):
+        _, meta = self.build(pattern(BLOCK))
+        self.assertNotIn("announce", meta)
+        self.assertNotIn("url-list", meta)
+
+    def test_rejects_invalid_piece_length(self):
+        with self.assertRaises(ValueError):
+            dm.TorrentGenerator(self.make_file(b"x"), piece_length=3 * BLOCK)
+
+
+@mock.patch.object(dm.hashlib, "new", md4_or_stand_in)
+class ZsyncTests(TempFileTestCase):
+    def build(self, data):
+        gen = dm.ZsyncGenerator(self.make_file(data))
+        return gen, feed(gen, data, 3000).finalize()
+
+    def test_header(self):
+        data = pattern(10000)
+        gen, out = self.build(data)
+        header, _ = out.split(b"\n\n", 1)
+        self.assertEqual(header.decode("ascii").splitlines(), [
+            "zsync: 0.6.2",
+            "Filename: test.iso",
+            "MTime: Tue, 14 Nov 2023 22:13:20 +0000",
+            "Blocksize: 2048",
+            "Length: 10000",
+            "Hash-Lengths: 2,2,3",
+            "URL: test.iso",
+            f"SHA-1: {hashlib.sha1(data).hexdigest()}",
+        ])
+
+    def test_block_count_and_zero_padded_last_block(self):
+        data = pattern(10000)
+        gen, out = self.build(data)
+        _, body = out.split(b"\n\n", 1)
+        record = gen.rsum_len + gen.checksum_len
+        self.assertEqual(len(body), 5 * record) # ceil(10000 / 2048)
+
+        last = data[4 * 2048:] + bytes(5 * 2048 - len(data))
+        a = sum(last) & 0xFFFF
+        b = sum((2048 - i) * c for i, c in enumerate(last)) & 0xFFFF
+        rsum = (a.to_bytes(2, "big") + b.to_bytes(2, "big"))[4 - gen.rsum_len:]
+        checksum = md4_or_stand_in("md4", last).digest()[:gen.checksum_len]
+        self.assertEqual(body[-record:], rsum + checksum)
+
+    def test_header_summary(self):
+        data = pattern(10000)
+        path = Path(self.tmp.name) / "test.iso.zsync"
+        gen = feed(dm.ZsyncGenerator(self.make_file(data)), data, 4096)
+        self.assertEqual(gen.write(path), {"Blocksize": 2048, "Blocks": 5, "Hash-Lengths": "2,2,3"})
+
+
+class ZsyncBuilderTests(TempFileTestCase):
+    def pipe(self, data):
+        builder = dm.ZsyncBuilder(self.make_file(data), Path(self.tmp.name) / "test.iso.zsync").start()
+        self.addCleanup(builder.terminate)
+        return feed(builder, data, 4096)
+
+    @unittest.skipUnless(MD4_AVAILABLE and not dm.zsyncmake_path(), "needs the built-in worker with MD4")
+    def test_worker_output_matches_generator(self):
+        data = pattern(10000)
+        builder = self.pipe(data)
+        self.assertEqual(builder.wait()["Blocks"], 5)
+        expected = feed(dm.ZsyncGenerator(self.make_file(data)), data, 4096).finalize()
+        self.assertEqual(builder.outpath.read_bytes(), expected)
+
+    @unittest.skipIf(MD4_AVAILABLE or dm.zsyncmake_path(), "needs a worker that fails")
+    def test_failed_worker_does_not_break_the_digest_pass(self):
+        builder = self.pipe(pattern(300000))
+        with self.assertRaises(RuntimeError):
+            builder.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Checks for the device-aware scheduling in job_queue.py.
+Run with: python3 -m pytest -q  (or python3 -m unittest discover tests)
+"""
+import os, sys, tempfile, unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import job_queue as jq
+
+# Arch-style btrfs layout: @ and @home subvolumes of one partition, plus a second disk.
+MOUNTINFO = """\
+22 1 0:21 /@ / rw,relatime shared:1 - btrfs /dev/nvme0n1p2 rw,subvol=/@
+23 22 0:21 /@home /home rw,relatime shared:2 - btrfs /dev/nvme0n1p2 rw,subvol=/@home
+24 22 8:17 / /mnt/iso\\040store rw,relatime shared:3 - ext4 /dev/sdb1 rw
+25 22 0:30 / /tmp rw,nosuid shared:4 - tmpfs tmpfs rw
+"""
+
+
+class MountSourceTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.NamedTemporaryFile("w", delete=False)
+        tmp.write(MOUNTINFO)
+        tmp.close()
+        self.addCleanup(os.unlink, tmp.name)
+        self.mountinfo = tmp.name
+
+    def test_longest_mount_point_wins(self):
+        self.assertEqual(jq.mount_source("/home/user/helwan.iso", self.mountinfo), "/dev/nvme0n1p2")
+        self.assertEqual(jq.mount_source("/var/release", self.mountinfo), "/dev/nvme0n1p2")
+        self.assertEqual(jq.mount_source("/tmp/x", self.mountinfo), "tmpfs")
+
+    def test_escaped_mount_point(self):
+        self.assertEqual(jq.mount_source("/mnt/iso store/a.iso", self.mountinfo), "/dev/sdb1")
+        self.assertEqual(jq.mount_source("/mnt/iso storeroom", self.mountinfo), "/dev/nvme0n1p2")
+
+    def test_btrfs_subvolumes_map_to_the_same_disk(self):
+        anon_devs = {"/home": os.makedev(0, 45), "/": os.makedev(0, 44)}
+        block_devs = {"/dev/nvme0n1p2": os.makedev(259, 2)}
+
+        def fake_stat(path):
+            path = str(path)
+            if path in block_devs:
+                return mock.Mock(st_rdev=block_devs[path])
+            return mock.Mock(st_dev=anon_devs["/home" if path.startswith("/home") else "/"])
+
+        def fake_disks(dev):
+            if os.major(dev) == 0:
+                raise OSError("no sysfs entry for anonymous device")
+            return {"nvme0n1"}
+
+        real_mount_source = jq.mount_source
+        with mock.patch.object(jq.os, "stat", fake_stat), \
+             mock.patch.object(jq, "_disks_for_dev", fake_disks), \
+             mock.patch.object(jq, "mount_source", lambda p: real_mount_source(p, self.mountinfo)), \
+             mock.patch.object(jq.Path, "exists", lambda self: True), \
+             mock.patch.object(jq.Path, "resolve", lambda self, strict=False: self):
+            self.assertEqual(jq.device_ids("/home/user/helwan.iso"), {"nvme0n1"})
+            self.assertEqual(jq.device_ids("/srv/release"), {"nvme0n1"})
+
+
+class SchedulerTests(unittest.TestCase):
+    def make_queue(self, *device_sets, max_concurrent=4):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        queue = jq.JobQueue(Path(tmp.name) / "queue.json", max_concurrent=max_concurrent)
+        for devices in device_sets:
+            job = jq.SigningJob("a.iso", "out", ["SHA256"])
+            job._devices = set(devices)
+            queue.add(job)
+        return queue
+
+    def test_same_disk_jobs_are_serialized(self):
+        queue = self.make_queue({"sda"}, {"sda"}, {"sdb"})
+        self.assertEqual(queue.runnable_jobs(), [queue.jobs[0], queue.jobs[2]])
+
+    def test_running_job_blocks_its_disk(self):
+        queue = self.make_queue({"sda"}, {"sda", "sdb"}, {"sdc"})
+        queue.jobs[0].status = jq.RUNNING
+        self.assertEqual(queue.runnable_jobs(), [queue.jobs[2]])
+
+    def test_runs_outside_the_queue_count_as_busy(self):
+        queue = self.make_queue({"sda"}, {"sdb"}, {"sdc"}, max_concurrent=2)
+        self.assertEqual(queue.runnable_jobs(busy_devices={"sda"}, busy_slots=1), [queue.jobs[1]])
+
+    def test_cpu_limit(self):
+        queue = self.make_queue({"sda"}, {"sdb"}, {"sdc"}, max_concurrent=2)
+        self.assertEqual(len(queue.runnable_jobs()), 2)
+
+    def test_paths_are_saved_absolute(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(tmp.name)
+        queue = jq.JobQueue(Path(tmp.name) / "queue.json")
+        queue.add(jq.SigningJob("isos/a.iso", "release", ["SHA256"]))
+        os.chdir(cwd)
+        restored = jq.JobQueue(queue.queue_file).load().jobs[0]
+        base = os.path.realpath(tmp.name)
+        self.assertEqual(os.path.realpath(restored.iso_path), os.path.join(base, "isos", "a.iso"))
+        self.assertEqual(os.path.realpath(restored.output_dir), os.path.join(base, "release"))
+
+    def test_running_jobs_are_requeued_on_load(self):
+        queue = self.make_queue({"sda"})
+        queue.set_status(queue.jobs[0], jq.RUNNING)
+        restored = jq.JobQueue(queue.queue_file).load()
+        self.assertEqual(restored.jobs[0].status, jq.QUEUED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Checks for the legacy report parser and the lookups in release_catalog.py.
+Run with: python3 -m pytest -q  (or python3 -m unittest discover tests)
+"""
+import contextlib, io, sys, tempfile, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import release_catalog as rc
+
+FPR = "E8DB2CA9B13D8CB0FCA1371A29B4577B6597E148"
+LONG_KEY_ID = FPR[-16:]
+SHA256 = "38f579e87f20e1de1e49e25d1991de06ad1d78469e1072ab2a75dfc9fd125bbb"
+SHA512 = "ab" * 64
+
+# Report exactly as written before distribution metadata existed.
+BASELINE_REPORT = f"""\
+File: helwan-1.0.iso
+Size: 30000000 bytes
+Generated: 2025-01-02T03:04:05.000000Z
+Release dir: /srv/release/helwan-1.0
+
+--- Signatures and Key ---
+Signature (binary): helwan-1.0.iso.sig
+Signature (armored): helwan-1.0.iso.sig.asc
+Public Key: helwan-key.asc
+
+--- Hashes ---
+SHA256: {SHA256}
+SHA512: {SHA512}
+
+--- GPG Info ---
+GPG Fingerprint: {FPR}
+GPG Key ID (long): {LONG_KEY_ID}
+
+Notes:
+- If the key was auto-generated by this script, it has NO passphrase for automation convenience.
+- Keep helwan-key.asc safe and publish it so users can import and verify the signature."""
+
+DIST_REPORT = BASELINE_REPORT.replace("\n\n--- GPG Info ---", """
+
+--- Distribution Metadata ---
+TORRENT: helwan-1.0.iso.torrent
+  Piece length: 262144
+  Info hash (v1): b8b16c0d0980f771d5ccc4c7d275bf1ec4e4c5b7
+ZSYNC: skipped (zsyncmake is not installed and MD4 is not available in this OpenSSL build)
+
+--- GPG Info ---""")
+
+
+def make_report(release_dir, **overrides):
+    report = {
+        "file": "helwan-1.0.iso",
+        "size": 30000000,
+        "generated": "2025-01-02T03:04:05Z",
+        "release_dir": str(release_dir),
+        "hashes": {"SHA256": SHA256},
+        "gpg": {"fingerprint": FPR},
+        "artifacts": {},
+    }
+    report.update(overrides)
+    return report
+
+
+class TempDirTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+
+class ParseTextReportTests(TempDirTestCase):
+    def write_report(self, text):
+        release_dir = self.root / "helwan-1.0"
+        release_dir.mkdir()
+        path = release_dir / "helwan-1.0.iso.report.txt"
+        path.write_text(text, encoding="utf-8")
+        return release_dir, path
+
+    def test_baseline_report(self):
+        release_dir, path = self.write_report(BASELINE_REPORT)
+        report = rc.parse_text_report(path)
+        self.assertEqual(report["file"], "helwan-1.0.iso")
+        self.assertEqual(report["size"], 30000000)
+        self.assertEqual(report["generated"], "2025-01-02T03:04:05.000000Z")
+        self.assertEqual(report["hashes"], {"SHA256": SHA256, "SHA512": SHA512})
+        self.assertEqual(report["gpg"], {"fingerprint": FPR, "long_key_id": LONG_KEY_ID})
+        self.assertEqual(report["release_dir"], str(release_dir.resolve()))
+        self.assertEqual(report["artifacts"], {
+            "signature": str(release_dir.resolve() / "helwan-1.0.iso.sig"),
+            "signature_armored": str(release_dir.resolve() / "helwan-1.0.iso.sig.asc"),
+            "public_key": str(release_dir.resolve() / "helwan-key.asc"),
+            "report": str(path.resolve()),
+        })
+
+    def test_distribution_section_with_skipped_format(self):
+        release_dir, path = self.write_report(DIST_REPORT)
+        report = rc.parse_text_report(path)
+        self.assertEqual(report["artifacts"]["torrent"], str(release_dir.resolve() / "helwan-1.0.iso.torrent"))
+        self.assertNotIn("zsync", report["artifacts"])
+        # Indented detail lines are not mistaken for hashes or artifacts
+        self.assertEqual(report["hashes"], {"SHA256": SHA256, "SHA512": SHA512})
+        self.assertNotIn("Piece length", report["artifacts"])
+
+    def test_rejects_other_files(self):
+        _, path = self.write_report("just some notes\n")
+        with self.assertRaises(ValueError):
+            rc.parse_text_report(path)
+
+
+class CatalogTests(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.catalog = rc.ReleaseCatalog(self.root, create=True)
+        self.addCleanup(self.catalog.close)
+
+    def test_record_release_replaces_the_same_release_dir(self):
+        release_dir = self.root / "helwan-1.0"
+        self.catalog.record_release(make_report(release_dir))
+        release_id = self.catalog.record_release(make_report(release_dir, hashes={"SHA512": SHA512}))
+        releases = self.catalog.find_by_name("helwan-1.0.iso")
+        self.assertEqual([r["id"] for r in releases], [release_id])
+        self.assertEqual(self.catalog.digests(release_id), {"SHA512": SHA512})
+        self.assertEqual(self.catalog.find_by_hash(SHA256), [])
+
+    def test_find_by_hash_prefix(self):
+        self.catalog.record_release(make_report(self.root / "a"))
+        self.catalog.record_release(make_report(self.root / "b", hashes={"SHA256": "38f5" + "0" * 60}))
+        self.catalog.record_release(make_report(self.root / "c", hashes={"SHA256": "ff" * 32}))
+        self.assertEqual(len(self.catalog.find_by_hash("38F5")), 2)
+        self.assertEqual([r["release_dir"] for r in self.catalog.find_by_hash(SHA256[:10])], [str(self.root / "a")])
+        self.assertEqual(self.catalog.find_by_hash("0123"), [])
+
+    def test_find_by_key(self):
+        self.catalog.record_release(make_report(self.root / "a"))
+        self.catalog.record_release(make_report(self.root / "b", gpg={"fingerprint": "0" * 40}))
+        by_fingerprint = self.catalog.find_by_key(FPR.lower())
+        by_long_id = self.catalog.find_by_key(LONG_KEY_ID)
+        self.assertEqual([r["release_dir"] for r in by_fingerprint], [str(self.root / "a")])
+        self.assertEqual(by_long_id, by_fingerprint)
+        self.assertEqual(by_long_id[0]["long_key_id"], LONG_KEY_ID)
+
+
+class CommandLineTests(TempDirTestCase):
+    def test_lookup_without_catalog_fails_and_creates_nothing(self):
+        missing_root = self.root / "missing"
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(rc.main(["lookup", str(missing_root), "--hash", SHA256]), 1)
+        self.assertIn("ERROR", stderr.getvalue())
+        self.assertFalse(missing_root.exists())
+        self.assertFalse((missing_root / rc.CATALOG_NAME).exists())
+
+    def test_lookup_on_an_empty_output_root_creates_nothing(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(rc.main(["lookup", str(self.root), "--key", LONG_KEY_ID]), 1)
+        self.assertEqual(list(self.root.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()